@@ -9,9 +9,7 @@ echo "✅ Web interface built successfully!"
 
 echo "📋 Copying files to data directory for SPIFFS upload..."
 # Copy all files except uncompressed .css and .js files
-cp -r dist/* ../data/
-# Remove uncompressed .css and .js files
-find ../data -name '*.css' -o -name '*.js' | grep -v '.gz$' | xargs rm -f
+(cd dist && tar --exclude='*.css' --exclude='*.js' -cf - .) | tar -xf - -C ../data
 
 echo "✅ Files copied to data/ directory!"
 
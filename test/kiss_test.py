@@ -6,9 +6,8 @@ Tests bidirectional communication between two LoRa devices
 
 import serial
 import time
-import sys
 import argparse
-from datetime import datetime
+import struct
 
 # KISS Protocol Constants
 FEND = 0xC0  # Frame End
@@ -16,6 +15,12 @@ FESC = 0xDB  # Frame Escape
 TFEND = 0xDC  # Transposed Frame End
 TFESC = 0xDD  # Transposed Frame Escape
 
+# Byte-string forms used for bulk (un)escaping
+FEND_B = bytes([FEND])
+FESC_B = bytes([FESC])
+FESC_TFEND = bytes([FESC, TFEND])
+FESC_TFESC = bytes([FESC, TFESC])
+
 # KISS Commands
 CMD_DATA = 0x00
 CMD_TXDELAY = 0x01
@@ -37,6 +42,15 @@ HW_SAVE_CONFIG = 0x07
 HW_RESET_CONFIG = 0x08
 HW_SET_SYNCWORD = 0x09
 
+# Last line the firmware logs at boot before it starts processing KISS
+READY_BANNER = b"LoRaTNCX ready - entering KISS mode"
+
+# Serial read timeout once the port is open
+PORT_TIMEOUT = 0.1
+
+# Config response payload: freq(4), bw_idx(1), sf(1), cr(1), power(1), syncword(2)
+CONFIG_REPLY = struct.Struct('<fBBBbH')
+
 
 class KISSFrame:
     """KISS frame encoder/decoder"""
@@ -44,79 +58,66 @@ class KISSFrame:
     @staticmethod
     def escape(data):
         """Apply KISS escaping to data"""
-        result = bytearray()
-        for byte in data:
-            if byte == FEND:
-                result.extend([FESC, TFEND])
-            elif byte == FESC:
-                result.extend([FESC, TFESC])
-            else:
-                result.append(byte)
-        return bytes(result)
+        # Most payloads contain neither special byte; the membership tests
+        # are C-level scans and avoid building new objects
+        if FEND not in data and FESC not in data:
+            return data
+        
+        # FESC must be escaped first so the FESC bytes introduced by the
+        # FEND substitution are not escaped a second time
+        return data.replace(FESC_B, FESC_TFESC).replace(FEND_B, FESC_TFEND)
     
     @staticmethod
     def unescape(data):
         """Remove KISS escaping from data"""
-        result = bytearray()
-        i = 0
-        while i < len(data):
-            if data[i] == FESC:
-                if i + 1 < len(data):
-                    if data[i + 1] == TFEND:
-                        result.append(FEND)
-                        i += 2
-                    elif data[i + 1] == TFESC:
-                        result.append(FESC)
-                        i += 2
-                    else:
-                        i += 1
-                else:
-                    i += 1
-            else:
-                result.append(data[i])
-                i += 1
-        return bytes(result)
+        # Nothing to undo unless the frame contains an escape lead
+        if FESC not in data:
+            return data
+        
+        # Each chunk after a FESC starts with the byte it escapes. A FESC
+        # not followed by TFEND/TFESC (including one at the end of the
+        # frame) is dropped and the byte after it kept as-is
+        parts = data.split(FESC_B)
+        result = [parts[0]]
+        for part in parts[1:]:
+            if part and part[0] == TFEND:
+                result.append(FEND_B)
+                part = part[1:]
+            elif part and part[0] == TFESC:
+                result.append(FESC_B)
+                part = part[1:]
+            result.append(part)
+        return b''.join(result)
     
     @staticmethod
     def encode_data_frame(data):
         """Encode data as KISS frame"""
-        frame = bytes([CMD_DATA]) + data
-        escaped = KISSFrame.escape(frame)
-        return bytes([FEND]) + escaped + bytes([FEND])
+        # The DATA command byte never needs escaping, so only the payload is
+        # escaped and the frame is assembled in a single join
+        return b''.join((FEND_B, bytes([CMD_DATA]), KISSFrame.escape(data), FEND_B))
     
     @staticmethod
     def encode_command(cmd, subcmd=None, data=None):
         """Encode KISS command frame"""
-        if subcmd is not None:
-            frame = bytes([cmd, subcmd])
-            if data:
-                frame += data
-        else:
-            frame = bytes([cmd])
-            if data:
-                frame += data
+        header = bytes([cmd] if subcmd is None else [cmd, subcmd])
         
-        escaped = KISSFrame.escape(frame)
-        return bytes([FEND]) + escaped + bytes([FEND])
+        # Escape header and payload separately and join once, instead of
+        # concatenating them and then wrapping the result in FENDs
+        return b''.join((FEND_B, KISSFrame.escape(header),
+                         KISSFrame.escape(data or b''), FEND_B))
     
     @staticmethod
     def decode(raw_data):
         """Decode received KISS frames from raw data"""
         frames = []
-        current = bytearray()
-        in_frame = False
         
-        for byte in raw_data:
-            if byte == FEND:
-                if in_frame and len(current) > 0:
-                    # End of frame
-                    unescaped = KISSFrame.unescape(bytes(current))
-                    if len(unescaped) > 0:
-                        frames.append(unescaped)
-                    current = bytearray()
-                in_frame = True
-            elif in_frame:
-                current.append(byte)
+        # Bytes before the first FEND and after the last one are not part
+        # of a complete frame
+        for part in raw_data.split(FEND_B)[1:-1]:
+            if part:
+                unescaped = KISSFrame.unescape(part)
+                if len(unescaped) > 0:
+                    frames.append(unescaped)
         
         return frames
 
@@ -128,14 +129,21 @@ class LoRaTNC:
         self.port = port
         self.baudrate = baudrate
         self.ser = None
+        # Unterminated frame data carried over between receive() calls
+        self.rx_buffer = bytearray()
         
     def open(self):
         """Open serial connection"""
         try:
-            self.ser = serial.Serial(self.port, self.baudrate, timeout=0.1)
-            time.sleep(2)  # Wait for device to be ready
+            self.ser = serial.Serial(self.port, self.baudrate, timeout=2.0)
+            # Wait for device to be ready: if opening the port reset the
+            # board, stop as soon as its boot banner is seen, otherwise
+            # give up after the 2 s port timeout
+            self.ser.read_until(READY_BANNER)
+            self.ser.timeout = PORT_TIMEOUT
             # Flush any startup data
             self.ser.reset_input_buffer()
+            self.rx_buffer.clear()
             return True
         except Exception as e:
             print(f"Error opening {self.port}: {e}")
@@ -155,22 +163,45 @@ class LoRaTNC:
         self.ser.write(frame)
         self.ser.flush()
     
-    def receive(self, timeout=1.0):
-        """Receive frames with timeout"""
-        start_time = time.time()
-        buffer = bytearray()
+    def receive(self, timeout=1.0, max_frames=None):
+        """Receive frames with timeout, returning early once max_frames arrive"""
+        start_time = time.monotonic()
+        port_timeout = self.ser.timeout
+        buffer = self.rx_buffer
+        frames = []
         
-        while time.time() - start_time < timeout:
-            if self.ser.in_waiting > 0:
-                buffer.extend(self.ser.read(self.ser.in_waiting))
-                time.sleep(0.05)  # Small delay to accumulate data
-            else:
-                time.sleep(0.01)
+        try:
+            while max_frames is None or len(frames) < max_frames:
+                remaining = timeout - (time.monotonic() - start_time)
+                if remaining <= 0:
+                    break
+                
+                # Block until data arrives (or the deadline passes), then
+                # drain whatever else is already buffered in one read.
+                # Setting the timeout reconfigures the port, so it is only
+                # shortened once it would overrun the deadline by more than
+                # one PORT_TIMEOUT read
+                if not self.ser.timeout or self.ser.timeout > remaining + PORT_TIMEOUT:
+                    self.ser.timeout = remaining
+                data = self.ser.read(self.ser.in_waiting or 1)
+                if not data:
+                    continue
+                buffer.extend(data)
+                
+                # Decode everything up to the last FEND and keep the tail,
+                # with its opening FEND, so a frame split across reads is
+                # not lost
+                end = buffer.rfind(FEND_B)
+                if end < 0:
+                    buffer.clear()
+                    continue
+                frames.extend(KISSFrame.decode(bytes(buffer[:end + 1])))
+                del buffer[:end]
+        finally:
+            if self.ser.timeout != port_timeout:
+                self.ser.timeout = port_timeout
         
-        if len(buffer) > 0:
-            frames = KISSFrame.decode(bytes(buffer))
-            return frames
-        return []
+        return frames
     
     def get_config(self):
         """Request current configuration"""
@@ -182,15 +213,9 @@ class LoRaTNC:
         frames = self.receive(timeout=2.0)
         if frames:
             for frame in frames:
-                if len(frame) >= 11 and frame[0] == CMD_DATA and frame[1] == HW_GET_CONFIG:
+                if len(frame) >= 2 + CONFIG_REPLY.size and frame[0] == CMD_DATA and frame[1] == HW_GET_CONFIG:
                     # Parse config response
-                    import struct
-                    freq = struct.unpack('<f', frame[2:6])[0]
-                    bw_idx = frame[6]
-                    sf = frame[7]
-                    cr = frame[8]
-                    power = struct.unpack('b', bytes([frame[9]]))[0]
-                    syncword = struct.unpack('<H', frame[10:12])[0]
+                    freq, bw_idx, sf, cr, power, syncword = CONFIG_REPLY.unpack_from(frame, 2)
                     
                     bw_map = {0: 125.0, 1: 250.0, 2: 500.0}
                     bw = bw_map.get(bw_idx, 125.0)
@@ -263,14 +288,14 @@ def test_bidirectional(port1, port2):
     print("Test 1: TNC1 → TNC2")
     print("-" * 70)
     
-    test_message1 = f"Hello from TNC1 at {datetime.now().strftime('%H:%M:%S')}"
+    test_message1 = f"Hello from TNC1 at {hex(time.monotonic_ns())[-8:]}"
     print(f"Sending: '{test_message1}'")
     
     tnc1.send_data(test_message1)
-    time.sleep(1.0)  # Give time for transmission
     
+    # Listen through transmission time too; returns as soon as the frame lands
     print("Listening on TNC2...")
-    frames = tnc2.receive(timeout=3.0)
+    frames = tnc2.receive(timeout=4.0, max_frames=1)
     
     if frames:
         print(f"✓ Received {len(frames)} frame(s)")
@@ -295,14 +320,14 @@ def test_bidirectional(port1, port2):
     print("Test 2: TNC2 → TNC1")
     print("-" * 70)
     
-    test_message2 = f"Hello from TNC2 at {datetime.now().strftime('%H:%M:%S')}"
+    test_message2 = f"Hello from TNC2 at {hex(time.monotonic_ns())[-8:]}"
     print(f"Sending: '{test_message2}'")
     
     tnc2.send_data(test_message2)
-    time.sleep(1.0)  # Give time for transmission
     
+    # Listen through transmission time too; returns as soon as the frame lands
     print("Listening on TNC1...")
-    frames = tnc1.receive(timeout=3.0)
+    frames = tnc1.receive(timeout=4.0, max_frames=1)
     
     if frames:
         print(f"✓ Received {len(frames)} frame(s)")
@@ -340,8 +365,7 @@ def test_bidirectional(port1, port2):
         time.sleep(0.5)  # Brief delay between messages
     
     print("Listening on TNC2 for all messages...")
-    time.sleep(2.0)
-    frames = tnc2.receive(timeout=5.0)
+    frames = tnc2.receive(timeout=7.0, max_frames=len(messages))
     
     if frames:
         print(f"✓ Received {len(frames)} frame(s)")
@@ -423,10 +447,9 @@ def interactive_mode(port1, port2):
                 msg = cmd[2:]
                 print(f"TNC1 >> {msg}")
                 tnc1.send_data(msg)
-                time.sleep(0.5)
                 
-                # Auto-check TNC2 for response
-                frames = tnc2.receive(timeout=2.0)
+                # Auto-check TNC2 for response (returns as soon as it arrives)
+                frames = tnc2.receive(timeout=2.5, max_frames=1)
                 if frames:
                     for frame in frames:
                         if frame[0] == CMD_DATA:
@@ -436,10 +459,9 @@ def interactive_mode(port1, port2):
                 msg = cmd[2:]
                 print(f"TNC2 >> {msg}")
                 tnc2.send_data(msg)
-                time.sleep(0.5)
                 
-                # Auto-check TNC1 for response
-                frames = tnc1.receive(timeout=2.0)
+                # Auto-check TNC1 for response (returns as soon as it arrives)
+                frames = tnc1.receive(timeout=2.5, max_frames=1)
                 if frames:
                     for frame in frames:
                         if frame[0] == CMD_DATA:
@@ -50,6 +50,7 @@ import time
 import sys
 import argparse
 import struct
+from collections import deque
 
 # KISS Protocol Constants
 FEND = 0xC0
@@ -57,6 +58,12 @@ FESC = 0xDB
 TFEND = 0xDC
 TFESC = 0xDD
 
+# Byte-string forms used for bulk (un)escaping
+FEND_B = bytes([FEND])
+FESC_B = bytes([FESC])
+FESC_TFEND = bytes([FESC, TFEND])
+FESC_TFESC = bytes([FESC, TFESC])
+
 # KISS Commands
 CMD_DATA = 0x00
 CMD_SETHARDWARE = 0x06
@@ -81,6 +88,18 @@ HW_QUERY_BOARD = 0x03
 HW_QUERY_GNSS = 0x04
 HW_QUERY_ALL = 0xFF
 
+# Last line the firmware logs at boot before it starts processing KISS
+READY_BANNER = b"LoRaTNCX ready - entering KISS mode"
+
+# Precompiled SETHARDWARE payload encoders
+FLOAT_LE = struct.Struct('<f')
+UINT16_LE = struct.Struct('<H')
+
+# Precompiled GETHARDWARE reply layouts (payload after cmd + subcmd)
+CONFIG_REPLY = struct.Struct('<ffBBbH')
+BATTERY_REPLY = struct.Struct('<fffBB')
+GNSS_REPLY = struct.Struct('<BBBfff')
+
 
 class KISSFrame:
     """KISS frame encoder/decoder"""
@@ -88,53 +107,105 @@ class KISSFrame:
     @staticmethod
     def escape(data):
         """Apply KISS escaping to data"""
-        result = bytearray()
-        for byte in data:
-            if byte == FEND:
-                result.extend([FESC, TFEND])
-            elif byte == FESC:
-                result.extend([FESC, TFESC])
-            else:
-                result.append(byte)
-        return bytes(result)
+        # Most payloads contain neither special byte; the membership tests
+        # are C-level scans and avoid building new objects
+        if FEND not in data and FESC not in data:
+            return data
+        
+        # FESC must be escaped first so the FESC bytes introduced by the
+        # FEND substitution are not escaped a second time
+        return data.replace(FESC_B, FESC_TFESC).replace(FEND_B, FESC_TFEND)
     
     @staticmethod
     def unescape(data):
         """Remove KISS escaping from data"""
-        result = bytearray()
-        i = 0
-        while i < len(data):
-            if data[i] == FESC:
-                if i + 1 < len(data):
-                    if data[i + 1] == TFEND:
-                        result.append(FEND)
-                        i += 2
-                    elif data[i + 1] == TFESC:
-                        result.append(FESC)
-                        i += 2
-                    else:
-                        i += 1
-                else:
-                    i += 1
-            else:
-                result.append(data[i])
-                i += 1
-        return bytes(result)
+        # Nothing to undo unless the frame contains an escape lead
+        if FESC not in data:
+            return data
+        
+        # Each chunk after a FESC starts with the byte it escapes. A FESC
+        # not followed by TFEND/TFESC (including one at the end of the
+        # frame) is dropped and the byte after it kept as-is
+        parts = data.split(FESC_B)
+        result = [parts[0]]
+        for part in parts[1:]:
+            if part and part[0] == TFEND:
+                result.append(FEND_B)
+                part = part[1:]
+            elif part and part[0] == TFESC:
+                result.append(FESC_B)
+                part = part[1:]
+            result.append(part)
+        return b''.join(result)
     
     @staticmethod
     def encode_command(cmd, subcmd=None, data=None):
         """Encode KISS command frame"""
-        if subcmd is not None:
-            frame = bytes([cmd, subcmd])
-            if data:
-                frame += data
-        else:
-            frame = bytes([cmd])
-            if data:
-                frame += data
+        header = bytes([cmd] if subcmd is None else [cmd, subcmd])
         
-        escaped = KISSFrame.escape(frame)
-        return bytes([FEND]) + escaped + bytes([FEND])
+        # Escape header and payload separately and join once, instead of
+        # concatenating them and then wrapping the result in FENDs
+        return b''.join((FEND_B, KISSFrame.escape(header),
+                         KISSFrame.escape(data or b''), FEND_B))
+
+
+def parse_config(frame):
+    """Parse a QUERY_CONFIG reply"""
+    # Format: CMD_GETHARDWARE, HW_QUERY_CONFIG, freq(4), bw(4), sf(1), cr(1), pwr(1), sync(2)
+    freq, bw, sf, cr, power, syncword = CONFIG_REPLY.unpack_from(frame, 2)
+    return {
+        'frequency': freq,
+        'bandwidth': bw,
+        'spreading_factor': sf,
+        'coding_rate': cr,
+        'power': power,
+        'syncword': syncword
+    }
+
+
+def parse_battery(frame):
+    """Parse a QUERY_BATTERY reply"""
+    # Format: CMD_GETHARDWARE, HW_QUERY_BATTERY, voltage(4), avg_voltage(4), percent(4), state(1), ready(1)
+    voltage, avg_voltage, percent, state, ready = BATTERY_REPLY.unpack_from(frame, 2)
+    return {
+        'voltage': voltage,
+        'avg_voltage': avg_voltage,
+        'percent': percent,
+        'state': state,
+        'ready': ready
+    }
+
+
+def parse_board(frame):
+    """Parse a QUERY_BOARD reply"""
+    # Format: CMD_GETHARDWARE, HW_QUERY_BOARD, board_type(1), board_name(string)
+    return {
+        'type': frame[2],
+        'name': frame[3:].decode('ascii', errors='ignore')
+    }
+
+
+def parse_gnss(frame):
+    """Parse a QUERY_GNSS reply"""
+    # Format: CMD_GETHARDWARE, HW_QUERY_GNSS, enabled(1), has_fix(1), satellites(1), lat(4), lon(4), alt(4)
+    enabled, has_fix, satellites, lat, lon, alt = GNSS_REPLY.unpack_from(frame, 2)
+    return {
+        'enabled': enabled != 0,
+        'has_fix': has_fix != 0,
+        'satellites': satellites,
+        'latitude': lat,
+        'longitude': lon,
+        'altitude': alt
+    }
+
+
+# GETHARDWARE reply dispatch: subcommand -> (result key, minimum frame length, parser)
+QUERY_PARSERS = {
+    HW_QUERY_CONFIG: ('config', 2 + CONFIG_REPLY.size, parse_config),
+    HW_QUERY_BATTERY: ('battery', 2 + BATTERY_REPLY.size, parse_battery),
+    HW_QUERY_BOARD: ('board', 3, parse_board),
+    HW_QUERY_GNSS: ('gnss', 2 + GNSS_REPLY.size, parse_gnss),
+}
 
 
 class LoRaTNCConfig:
@@ -145,15 +216,26 @@ class LoRaTNCConfig:
         self.baud = baud
         self.timeout = timeout
         self.ser = None
+        # Receive state persists across calls so that frames arriving in
+        # the same read as an earlier reply are not thrown away
+        self.rx_buffer = bytearray()
+        self.rx_frames = deque()
     
     def open(self):
         """Open serial connection"""
         try:
-            self.ser = serial.Serial(self.port, self.baud, timeout=self.timeout)
-            time.sleep(0.5)  # Let port stabilize
+            self.ser = serial.Serial(self.port, self.baud, timeout=0.5)
+            
+            # Let port stabilize: if opening the port reset the board, stop
+            # as soon as its boot banner is seen, otherwise give up after 0.5 s
+            self.ser.read_until(READY_BANNER)
+            self.ser.timeout = self.timeout
+            
             # Flush any pending data
             self.ser.reset_input_buffer()
             self.ser.reset_output_buffer()
+            self.rx_buffer.clear()
+            self.rx_frames.clear()
             return True
         except Exception as e:
             print(f"Error opening {self.port}: {e}")
@@ -174,145 +256,87 @@ class LoRaTNCConfig:
         """Send GETHARDWARE query command"""
         frame = KISSFrame.encode_command(CMD_GETHARDWARE, subcmd, data)
         self.ser.write(frame)
-        time.sleep(0.1)  # Brief delay for query processing
     
     def receive_frame(self, timeout=2.0):
         """Receive a KISS frame"""
-        buffer = bytearray()
-        start_time = time.time()
+        start_time = time.monotonic()
+        port_timeout = self.ser.timeout
         
-        while time.time() - start_time < timeout:
-            if self.ser.in_waiting > 0:
-                data = self.ser.read(self.ser.in_waiting)
+        try:
+            while True:
+                # Hand out frames already split from an earlier read first
+                while self.rx_frames:
+                    unescaped = KISSFrame.unescape(bytes(self.rx_frames.popleft()))
+                    if len(unescaped) > 0:
+                        return unescaped
+                
+                remaining = timeout - (time.monotonic() - start_time)
+                if remaining <= 0:
+                    break
+                
+                # Block until data arrives (or the deadline passes), then
+                # drain whatever else is already buffered in one read.
+                # Setting the timeout reconfigures the port, so it is only
+                # shortened once it would overrun the deadline noticeably
+                if not self.ser.timeout or self.ser.timeout > remaining + 0.05:
+                    self.ser.timeout = remaining
+                data = self.ser.read(self.ser.in_waiting or 1)
+                if not data:
+                    continue
+                buffer = self.rx_buffer
                 buffer.extend(data)
                 
-                # Look for complete KISS frame
-                while len(buffer) >= 2:
-                    # Find frame start
-                    if buffer[0] != FEND:
-                        buffer.pop(0)
-                        continue
-                    
-                    # Look for frame end
-                    try:
-                        end_idx = buffer.index(FEND, 1)
-                        frame_data = bytes(buffer[1:end_idx])
-                        buffer = buffer[end_idx+1:]
-                        
-                        # Unescape and return
-                        unescaped = KISSFrame.unescape(frame_data)
-                        if len(unescaped) > 0:
-                            return unescaped
-                    except ValueError:
-                        break  # No end marker yet
-            
-            time.sleep(0.01)
+                # Split on FEND in one pass: bytes before the first FEND are
+                # noise, bytes after the last FEND belong to a frame that is
+                # still arriving and are kept (with their opening FEND)
+                parts = buffer.split(FEND_B)
+                if len(parts) == 1:
+                    buffer.clear()
+                    continue
+                buffer[:] = FEND_B
+                buffer += parts[-1]
+                self.rx_frames.extend(part for part in parts[1:-1] if part)
+        finally:
+            if self.ser.timeout != port_timeout:
+                self.ser.timeout = port_timeout
         
         return None
     
+    def query(self, subcmd, timeout=3.0):
+        """Send a GETHARDWARE query and parse the matching reply"""
+        self.send_query(subcmd)
+        _, min_len, parser = QUERY_PARSERS[subcmd]
+        
+        # Wait for response, skipping anything else the TNC sends meanwhile
+        # (e.g. received LoRa packets forwarded as DATA frames)
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            
+            frame = self.receive_frame(timeout=remaining)
+            if not frame:
+                return None
+            
+            if len(frame) >= min_len and frame[0] == CMD_GETHARDWARE and frame[1] == subcmd:
+                return parser(frame)
+    
     def get_config(self):
         """Get current configuration from TNC"""
-        # Send QUERY_CONFIG command
-        self.send_query(HW_QUERY_CONFIG)
-        
-        # Wait for response
-        frame = self.receive_frame(timeout=3.0)
-        
-        if not frame:
-            return None
-        
-        # Parse response
-        # Format: CMD_GETHARDWARE, HW_QUERY_CONFIG, freq(4), bw(4), sf(1), cr(1), pwr(1), sync(2)
-        if len(frame) < 15 or frame[0] != CMD_GETHARDWARE or frame[1] != HW_QUERY_CONFIG:
-            return None
-        
-        config = {}
-        config['frequency'] = struct.unpack('<f', frame[2:6])[0]
-        config['bandwidth'] = struct.unpack('<f', frame[6:10])[0]
-        config['spreading_factor'] = frame[10]
-        config['coding_rate'] = frame[11]
-        config['power'] = struct.unpack('<b', bytes([frame[12]]))[0]
-        config['syncword'] = struct.unpack('<H', frame[13:15])[0]
-        
-        return config
+        return self.query(HW_QUERY_CONFIG)
     
     def get_battery(self):
         """Get battery status from TNC"""
-        # Send QUERY_BATTERY command
-        self.send_query(HW_QUERY_BATTERY)
-        
-        # Wait for response
-        frame = self.receive_frame(timeout=3.0)
-        
-        if not frame:
-            return None
-        
-        # Parse response
-        # Format: CMD_GETHARDWARE, HW_QUERY_BATTERY, voltage(4), avg_voltage(4), percent(4), state(1), ready(1)
-        if len(frame) < 15 or frame[0] != CMD_GETHARDWARE or frame[1] != HW_QUERY_BATTERY:
-            return None
-        
-        voltage = struct.unpack('<f', frame[2:6])[0]
-        avg_voltage = struct.unpack('<f', frame[6:10])[0]
-        percent = struct.unpack('<f', frame[10:14])[0]
-        state = frame[14]
-        ready = frame[15]
-        
-        return {
-            'voltage': voltage,
-            'avg_voltage': avg_voltage,
-            'percent': percent,
-            'state': state,
-            'ready': ready
-        }
+        return self.query(HW_QUERY_BATTERY)
     
     def get_board(self):
         """Get board information from TNC"""
-        # Send QUERY_BOARD command
-        self.send_query(HW_QUERY_BOARD)
-        
-        # Wait for response
-        frame = self.receive_frame(timeout=3.0)
-        
-        if not frame:
-            return None
-        
-        # Parse response
-        # Format: CMD_GETHARDWARE, HW_QUERY_BOARD, board_type(1), board_name(string)
-        if len(frame) < 3 or frame[0] != CMD_GETHARDWARE or frame[1] != HW_QUERY_BOARD:
-            return None
-        
-        board = {}
-        board['type'] = frame[2]
-        board['name'] = frame[3:].decode('ascii', errors='ignore')
-        
-        return board
+        return self.query(HW_QUERY_BOARD)
     
     def get_gnss(self):
         """Get GNSS status and position from TNC"""
-        # Send QUERY_GNSS command
-        self.send_query(HW_QUERY_GNSS)
-        
-        # Wait for response
-        frame = self.receive_frame(timeout=3.0)
-        
-        if not frame:
-            return None
-        
-        # Parse response
-        # Format: CMD_GETHARDWARE, HW_QUERY_GNSS, enabled(1), has_fix(1), satellites(1), lat(4), lon(4), alt(4)
-        if len(frame) < 17 or frame[0] != CMD_GETHARDWARE or frame[1] != HW_QUERY_GNSS:
-            return None
-        
-        gnss = {}
-        gnss['enabled'] = frame[2] != 0
-        gnss['has_fix'] = frame[3] != 0
-        gnss['satellites'] = frame[4]
-        gnss['latitude'] = struct.unpack('<f', frame[5:9])[0]
-        gnss['longitude'] = struct.unpack('<f', frame[9:13])[0]
-        gnss['altitude'] = struct.unpack('<f', frame[13:17])[0]
-        
-        return gnss
+        return self.query(HW_QUERY_GNSS)
     
     def get_all(self):
         """Get all hardware information from TNC"""
@@ -333,55 +357,25 @@ class LoRaTNCConfig:
             if not frame or frame[0] != CMD_GETHARDWARE:
                 continue
             
-            subcmd = frame[1]
-            
-            if subcmd == HW_QUERY_CONFIG and len(frame) >= 15:
-                config = {}
-                config['frequency'] = struct.unpack('<f', frame[2:6])[0]
-                config['bandwidth'] = struct.unpack('<f', frame[6:10])[0]
-                config['spreading_factor'] = frame[10]
-                config['coding_rate'] = frame[11]
-                config['power'] = struct.unpack('<b', bytes([frame[12]]))[0]
-                config['syncword'] = struct.unpack('<H', frame[13:15])[0]
-                all_info['config'] = config
-            
-            elif subcmd == HW_QUERY_BATTERY and len(frame) >= 15:
-                battery = {
-                    'voltage': struct.unpack('<f', frame[2:6])[0],
-                    'avg_voltage': struct.unpack('<f', frame[6:10])[0],
-                    'percent': struct.unpack('<f', frame[10:14])[0],
-                    'state': frame[14],
-                    'ready': frame[15]
-                }
-                all_info['battery'] = battery
-            
-            elif subcmd == HW_QUERY_BOARD and len(frame) >= 3:
-                board = {}
-                board['type'] = frame[2]
-                board['name'] = frame[3:].decode('ascii', errors='ignore')
-                all_info['board'] = board
+            entry = QUERY_PARSERS.get(frame[1])
+            if entry is None:
+                continue
             
-            elif subcmd == HW_QUERY_GNSS and len(frame) >= 17:
-                gnss = {}
-                gnss['enabled'] = frame[2] != 0
-                gnss['has_fix'] = frame[3] != 0
-                gnss['satellites'] = frame[4]
-                gnss['latitude'] = struct.unpack('<f', frame[5:9])[0]
-                gnss['longitude'] = struct.unpack('<f', frame[9:13])[0]
-                gnss['altitude'] = struct.unpack('<f', frame[13:17])[0]
-                all_info['gnss'] = gnss
+            key, min_len, parser = entry
+            if len(frame) >= min_len:
+                all_info[key] = parser(frame)
         
         return all_info
     
     def set_frequency(self, freq_mhz):
         """Set frequency in MHz (e.g., 915.0)"""
-        data = struct.pack('<f', float(freq_mhz))
+        data = FLOAT_LE.pack(float(freq_mhz))
         self.send_command(HW_SET_FREQUENCY, data)
         print(f"✓ Set frequency to {freq_mhz} MHz")
     
     def set_bandwidth(self, bw_khz):
         """Set bandwidth in kHz (e.g., 125.0)"""
-        data = struct.pack('<f', float(bw_khz))
+        data = FLOAT_LE.pack(float(bw_khz))
         self.send_command(HW_SET_BANDWIDTH, data)
         print(f"✓ Set bandwidth to {bw_khz} kHz")
     
@@ -399,7 +393,7 @@ class LoRaTNCConfig:
     
     def set_power(self, power_dbm):
         """Set output power in dBm (e.g., 20)"""
-        data = struct.pack('<b', int(power_dbm))
+        data = int(power_dbm).to_bytes(1, 'little', signed=True)
         self.send_command(HW_SET_POWER, data)
         print(f"✓ Set output power to {power_dbm} dBm")
     
@@ -407,7 +401,7 @@ class LoRaTNCConfig:
         """Set sync word (2-byte value, e.g., 0x1424)"""
         if isinstance(syncword, str):
             syncword = int(syncword, 16)
-        data = struct.pack('<H', int(syncword))
+        data = UINT16_LE.pack(int(syncword))
         self.send_command(HW_SET_SYNCWORD, data)
         print(f"✓ Set sync word to 0x{syncword:04X}")
     
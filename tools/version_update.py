@@ -64,14 +64,21 @@ def update_version(major=None, minor=None, patch=None):
     version_string = f"{new_major}.{new_minor}.{new_patch}"
 
     with open(VERSION_FILE, 'r') as f:
-        content = f.read()
+        original = f.read()
 
     # Update defines
+    content = original
     content = re.sub(r'#define FIRMWARE_VERSION_MAJOR \d+', f'#define FIRMWARE_VERSION_MAJOR {new_major}', content)
     content = re.sub(r'#define FIRMWARE_VERSION_MINOR \d+', f'#define FIRMWARE_VERSION_MINOR {new_minor}', content)
     content = re.sub(r'#define FIRMWARE_VERSION_PATCH \d+', f'#define FIRMWARE_VERSION_PATCH {new_patch}', content)
     content = re.sub(r'#define FIRMWARE_VERSION_STRING "[^"]*"', f'#define FIRMWARE_VERSION_STRING "{version_string}"', content)
 
+    # Leave the file (and its mtime) alone if nothing changed, so the
+    # firmware sources that include version.h are not rebuilt
+    if content == original:
+        print(f"Version already {version_string}, version.h unchanged")
+        return True
+
     with open(VERSION_FILE, 'w') as f:
         f.write(content)
 